@@ -61,7 +61,7 @@ set_config(blocking=True, set_view_on_display="isometric")
 #######################################################################################
 # Launch Fluent session with meshing mode
 # =====================================================================================
-session = pyfluent.launch_fluent(mode="meshing", cleanup_on_exit=True)
+session = pyfluent.launch_fluent(mode="meshing", show_gui=False, cleanup_on_exit=True)
 session.check_health()
 
 #######################################################################################
@@ -307,11 +307,8 @@ contour1.field = "velocity-magnitude"
 contour1.surfaces_list = ["xmid"]
 contour1.display("window-1")
 
-contour2 = graphics_session1.Contours["contour-2"]
-contour2.field.allowed_values
-contour2.field = "pressure-coefficient"
-contour2.surfaces_list = ["xmid"]
-contour2.display("window-2")
+contour1.field = "pressure-coefficient"
+contour1.display("window-2")
 
 #######################################################################################
 # Simulation Results Visualization
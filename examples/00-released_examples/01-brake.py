@@ -19,7 +19,6 @@ This example demonstrates:
 # Import required libraries/modules
 # ==================================================================================
 
-import csv
 from pathlib import Path
 
 import ansys.fluent.core as pyfluent
@@ -34,6 +33,7 @@ import ansys.fluent.visualization.pyvista as pv
 # Matplotlib
 # --------------------
 import matplotlib.pyplot as plt
+import numpy as np
 
 ###############################################################################
 # Specifying save path
@@ -354,30 +354,22 @@ contour1.display()
 # Read monitor file
 # -----------------
 
-X = []
-Y = []
-Z = []
-i = -1
-with open(report_file_path, "r") as datafile:
-    plotting = csv.reader(datafile, delimiter=" ")
-    for rows in plotting:
-        i = i + 1
-        if i > 2:
-            X.append(float(rows[3]))
-            Y.append(float(rows[2]))
-            Z.append(float(rows[1]))
+# Skip the three header lines, then read the max pad temperature (Z), max disc
+# temperature (Y) and flow time (X) columns
+Z, Y, X = np.loadtxt(report_file_path, skiprows=3, usecols=(1, 2, 3), unpack=True)
 
 ###############################################
 # Plot graph
 # ----------
 
 
-plt.title("Maximum Temperature", fontdict={"color": "darkred", "size": 20})
-plt.plot(X, Z, label="Max. Pad Temperature", color="red")
-plt.plot(X, Y, label="Max. Disc Temperature", color="blue")
-plt.xlabel("Time (sec)")
-plt.ylabel("Max Temperature (K)")
-plt.legend(loc="lower right", shadow=True, fontsize="x-large")
+fig, ax = plt.subplots()
+ax.set_title("Maximum Temperature", fontdict={"color": "darkred", "size": 20})
+ax.plot(X, Z, label="Max. Pad Temperature", color="red")
+ax.plot(X, Y, label="Max. Disc Temperature", color="blue")
+ax.set_xlabel("Time (sec)")
+ax.set_ylabel("Max Temperature (K)")
+ax.legend(loc="lower right", shadow=True, fontsize="x-large")
 
 ###############################################
 # Show graph
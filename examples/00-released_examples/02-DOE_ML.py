@@ -28,18 +28,22 @@ Design of Experiments and Machine Learning model building
 # Import required libraries/modules
 # =================================
 
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+from itertools import repeat
+import json
 from pathlib import Path
+import threading
 
 import ansys.fluent.core as pyfluent
 from ansys.fluent.core import examples
+from joblib import Memory
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import seaborn as sns
-import tensorflow as tf
-from tensorflow import keras
 
 ###########################################################################
 # Specifying save path
@@ -60,68 +64,203 @@ import_filename = examples.download_file(
 # Fluent Solution Setup
 # =====================
 
-########################################
-# Launch Fluent session with solver mode
-# ======================================
-
-solver = pyfluent.launch_fluent(
-    product_version="23.1.0",
-    mode="solver",
-    show_gui=False,
-    version="3d",
-    precision="double",
-    processor_count=2,
+#########################################
+# Launch Fluent sessions with solver mode
+# =======================================
+# The DOE points are independent of each other, so they are shared out over several
+# Fluent sessions that solve concurrently. Each session uses processor_count cores
+# and one Fluent license, adjust n_sessions to the available hardware and licenses.
+# Every session reads the case once and is then reused for all of its DOE points.
+# The output report definition is also defined once per session and only computed
+# after each DOE point is solved.
+
+n_sessions = 2
+
+# Solve settings of every DOE point, these are part of the keys of the cached results.
+# Each point starts from the solution of the point its session solved before it, so
+# the number of sessions, which decides how the points are shared out, is included.
+n_iterations = 200
+outlet_report = {
+    "report_type": "surface-massavg",
+    "field": "temperature",
+    "surface_names": ["outlet"],
+}
+settings_tag = json.dumps(
+    {
+        "iterations": n_iterations,
+        "outlet-temp-avg": outlet_report,
+        "sessions": n_sessions,
+    },
+    sort_keys=True,
 )
-solver.health_check_service.check_health()
 
 
-#############################################################################
-# Read case
-# =========
+def launch_solver():
+    solver = pyfluent.launch_fluent(
+        product_version="23.1.0",
+        mode="solver",
+        show_gui=False,
+        version="3d",
+        precision="double",
+        processor_count=2,
+    )
+    solver.health_check_service.check_health()
+    solver.tui.file.read_case(import_filename)
+    solver.solution.report_definitions.surface["outlet-temp-avg"] = outlet_report
+    return solver
 
-solver.tui.file.read_case(import_filename)
 
 ###############################################################################
 # Design of Experiments
 # =====================
 # * Define Manual DOE as numpy arrays
-# * Run cases in sequence
+# * Run cases concurrently, one thread driving each Fluent session
 # * Populate results (Mass Weighted Average of Temperature at Outlet) in resArr
+#
+# Results of each DOE point are cached on disk, keyed by the case file contents, the
+# solve settings and the inlet velocities, so re-running the example (for instance
+# while tweaking the post-processing or after an interrupted run) only solves the
+# points that have not been computed before. Since every point is warm-started from
+# the previous point solved by its session, a cached value depends on which points
+# were solved before it and can differ slightly from the value of a run that solves
+# the whole DOE from scratch, within the convergence of the iterations. Each newly
+# solved result is also appended to a CSV file named after the case, solve settings
+# and DOE (like the saved resArr below) as soon as it is available, after the
+# results of earlier runs of the same DOE. Once the whole DOE has been solved, resArr is
+# saved as well, so that later runs of the same DOE on the same case load it without
+# launching Fluent.
 
 coldVelArr = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7])
 hotVelArr = np.array([0.8, 1, 1.2, 1.4, 1.6, 1.8, 2.0])
 resArr = np.zeros((coldVelArr.shape[0], hotVelArr.shape[0]))
+coldVelList = coldVelArr.tolist()
+hotVelList = hotVelArr.tolist()
+
+case_hash = hashlib.sha256(Path(import_filename).read_bytes()).hexdigest()
+memory = Memory(Path(save_path, "doe_cache"), verbose=0)
+
+# The key holds the shape of the DOE as well as its inlet velocities, so that the
+# same velocities split differently between the two inlets give another key
+doe_key = repr((case_hash, settings_tag, resArr.shape, coldVelList, hotVelList))
+doe_hash = hashlib.sha256(doe_key.encode()).hexdigest()
+doe_results_cache = Path(save_path, f"doe_{doe_hash[:16]}.npz")
+doe_results_file = Path(save_path, f"doe_{doe_hash[:16]}.csv")
+
+
+def set_inlet_velocity(session_state, name, velocity):
+    # Consecutive DOE points often share an inlet velocity, skip the update then
+    if session_state["velocities"].get(name) == velocity:
+        return
+    session_state["inlets"][name].vmag = {"option": "value", "value": velocity}
+    session_state["velocities"][name] = velocity
+
+
+@memory.cache(ignore=["solver", "session_state"])
+def run_case(solver, session_state, case_hash, settings_tag, coldVel, hotVel):
+    # case_hash and settings_tag are only part of the cache key, so that a new case
+    # file or new solve settings invalidate the results computed with the old ones
+    set_inlet_velocity(session_state, "cold-inlet", coldVel)
+    set_inlet_velocity(session_state, "hot-inlet", hotVel)
+
+    # Only the first point solved by a session starts from an initialized flow, the
+    # next points start from the converged solution of the previous, neighboring one
+    if not session_state["initialized"]:
+        solver.tui.solve.initialize.initialize_flow("yes")
+        session_state["initialized"] = True
+    solver.tui.solve.iterate(n_iterations)
 
-for idx1, coldVel in np.ndenumerate(coldVelArr):
-    for idx2, hotVel in np.ndenumerate(hotVelArr):
-        solver.setup.boundary_conditions.velocity_inlet["cold-inlet"].vmag = {
-            "option": "value",
-            "value": coldVel,
-        }
+    report = solver.solution.report_definitions.compute(report_defs=["outlet-temp-avg"])
+    return report[0]["outlet-temp-avg"][0]
 
-        solver.setup.boundary_conditions.velocity_inlet["hot-inlet"].vmag = {
-            "option": "value",
-            "value": hotVel,
-        }
 
-        solver.tui.solve.initialize.initialize_flow("yes")
-        solver.tui.solve.iterate(200)
+results_lock = threading.Lock()
 
-        res_tui = solver.scheme_eval.exec(
-            (
-                "(ti-menu-load-string "
-                '"/report/surface-integrals/mass-weighted-avg outlet () '
-                'temperature no")',
-            )
+
+def run_points(solver, points, results_file, recorded_points):
+    # Solve a share of the DOE points one after another in a single session. The
+    # inlet objects and the inlet velocities last sent to them belong to this session
+    # only, so they are created here and are gone with it.
+    session_state = {
+        "inlets": {
+            name: solver.setup.boundary_conditions.velocity_inlet[name]
+            for name in ("cold-inlet", "hot-inlet")
+        },
+        "velocities": {},
+        "initialized": False,
+    }
+    for idx1, idx2 in points:
+        coldVel = coldVelList[idx1]
+        hotVel = hotVelList[idx2]
+        resArr[idx1][idx2] = run_case(
+            solver, session_state, case_hash, settings_tag, coldVel, hotVel
         )
-        resArr[idx1][idx2] = eval(res_tui.split(" ")[-1])
 
+        # Persist every point as soon as it is solved, unless an earlier run of this
+        # DOE already recorded it
+        if (coldVel, hotVel) in recorded_points:
+            continue
+        with results_lock:
+            results_file.write(f"{coldVel},{hotVel},{resArr[idx1][idx2]}\n")
+            results_file.flush()
 
-####################################################################
-# Close the session
-# =================
 
-solver.exit()
+# The points are ordered in a snake pattern, reversing the hot inlet velocity order
+# on every other cold inlet velocity, and each session gets a contiguous block of
+# them, so that consecutive points solved by a session are neighbors in the DOE
+doe_points = [
+    (idx1, idx2 if idx1 % 2 == 0 else resArr.shape[1] - 1 - idx2)
+    for idx1, idx2 in np.ndindex(resArr.shape)
+]
+points_per_session = np.array_split(doe_points, n_sessions)
+
+###############################################################################
+# Run the DOE
+# ===========
+# Launch the Fluent sessions, solve the DOE points and close the sessions, unless
+# the results of this DOE are already available from a previous run.
+
+if doe_results_cache.exists():
+    resArr = np.load(doe_results_cache)["resArr"]
+else:
+    solvers = []
+    try:
+        with ThreadPoolExecutor(max_workers=n_sessions) as executor:
+            launches = [executor.submit(launch_solver) for _ in range(n_sessions)]
+        # Keep every session that did start, so that it is closed even if another
+        # launch failed, then raise the first launch error if there was one
+        solvers = [launch.result() for launch in launches if launch.exception() is None]
+        for launch in launches:
+            launch.result()
+
+        # Append to the results of previous, possibly interrupted, runs of this DOE
+        recorded_points = set()
+        if doe_results_file.exists():
+            recorded = np.loadtxt(
+                doe_results_file, delimiter=",", skiprows=1, usecols=(0, 1), ndmin=2
+            )
+            recorded_points = set(map(tuple, recorded.tolist()))
+        write_header = not doe_results_file.exists()
+        with open(doe_results_file, "a") as f:
+            if write_header:
+                f.write("coldVel,hotVel,Result\n")
+
+            # pyfluent sessions cannot be shared between processes, and the threads
+            # only wait on their Fluent session, so a thread pool is enough to run them
+            with ThreadPoolExecutor(max_workers=n_sessions) as executor:
+                list(
+                    executor.map(
+                        run_points,
+                        solvers,
+                        points_per_session,
+                        repeat(f),
+                        repeat(recorded_points),
+                    )
+                )
+    finally:
+        for solver in solvers:
+            solver.exit()
+
+    np.savez_compressed(doe_results_cache, resArr=resArr)
 
 ####################################
 # Plot Response Surface using Plotly
@@ -159,19 +298,15 @@ fig.show()
 ############################################
 # Create Pandas Dataframe for ML Model Input
 # ==========================================
-coldVelList = []
-hotVelList = []
-ResultList = []
-
-for idx1, coldVel in np.ndenumerate(coldVelArr):
-    for idx2, hotVel in np.ndenumerate(hotVelArr):
-        coldVelList.append(coldVel)
-        hotVelList.append(hotVel)
-        ResultList.append(resArr[idx1][idx2])
-
-tempDict = {"coldVel": coldVelList, "hotVel": hotVelList, "Result": ResultList}
+coldVelGrid, hotVelGrid = np.meshgrid(coldVelArr, hotVelArr, indexing="ij")
 
-df = pd.DataFrame.from_dict(tempDict)
+df = pd.DataFrame(
+    {
+        "coldVel": coldVelGrid.ravel(),
+        "hotVel": hotVelGrid.ravel(),
+        "Result": resArr.ravel(),
+    }
+)
 
 from sklearn.compose import ColumnTransformer
 from sklearn.model_selection import train_test_split
@@ -182,7 +317,7 @@ from sklearn.preprocessing import PolynomialFeatures, StandardScaler
 # Using scikit-learn
 # ==================
 # * Prepare Features (X) and Label (y) using a Pre-Processing Pipeline
-# * Train-Test (80-20) Split
+# * Train-Test (80-20) Split, the pipeline is fitted on the training set only
 # * Add Polynomial Features to improve ML Model
 
 poly_features = PolynomialFeatures(degree=2, include_bias=False)
@@ -205,7 +340,7 @@ x_ct = ColumnTransformer(
 train_set, test_set = train_test_split(df, test_size=0.2, random_state=42)
 
 X_train = x_ct.fit_transform(train_set)
-X_test = x_ct.fit_transform(test_set)
+X_test = x_ct.transform(test_set)
 
 y_train = train_set["Result"]
 y_test = test_set["Result"]
@@ -223,10 +358,10 @@ y_test = np.ravel(y_test.T)
 from pprint import pprint  # noqa: F401
 
 from sklearn.ensemble import RandomForestRegressor  # noqa: F401
-from sklearn.linear_model import LinearRegression  # noqa: F401
+from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score
 from sklearn.model_selection import RepeatedKFold, cross_val_score
-from xgboost import XGBRegressor
+from xgboost import XGBRegressor  # noqa: F401
 
 np.set_printoptions(precision=2)
 
@@ -237,13 +372,27 @@ def display_scores(scores):
     print("Std. Dev.:%0.2f" % (scores.std()))
 
 
+def loo_errors(X, y, fit_intercept=True):
+    # Leave-one-out errors of a linear least-squares fit, obtained from a single fit
+    # through the diagonal of the hat matrix H = P (P^T P)^-1 P^T
+    P = np.column_stack([np.ones(X.shape[0]), X]) if fit_intercept else X
+    coefficients, *_ = np.linalg.lstsq(P, y, rcond=None)
+    leverage = np.einsum("ij,ji->i", P, np.linalg.pinv(P))
+    return (y - P @ coefficients) / (1 - leverage)
+
+
 def fit_and_predict(model):
-    cv = RepeatedKFold(n_splits=5, n_repeats=3, random_state=42)
-    cv_scores = cross_val_score(
-        model, X_train, y_train, scoring="neg_mean_squared_error", cv=cv
-    )
-    rmse_scores = np.sqrt(-cv_scores)
-    display_scores(rmse_scores)
+    if isinstance(model, LinearRegression):
+        # A linear model is scored by its exact leave-one-out RMSE instead
+        errors = loo_errors(X_train, y_train, model.fit_intercept)
+        print("\nLeave-One-Out RMSE:%0.2f" % (np.sqrt(np.mean(errors**2))))
+    else:
+        cv = RepeatedKFold(n_splits=5, n_repeats=3, random_state=42)
+        cv_scores = cross_val_score(
+            model, X_train, y_train, scoring="neg_mean_squared_error", cv=cv
+        )
+        rmse_scores = np.sqrt(-cv_scores)
+        display_scores(rmse_scores)
 
     model.fit(X_train, y_train)
     train_predictions = model.predict(X_train)
@@ -300,11 +449,16 @@ def fit_and_predict(model):
 # Select the Model from Linear, Random Forest or XGBoost
 # ======================================================
 # * Call fit_and_predict
-
-# model = LinearRegression()
-model = XGBRegressor(
-    n_estimators=100, max_depth=10, eta=0.3, subsample=0.8, random_state=42
-)
+#
+# The features already include the degree 2 polynomial terms, so a linear model
+# fitted on them is a least-squares quadratic response surface. For a small and
+# smooth DOE like this one it is solved in closed form and fits far faster than the
+# tree ensembles, which remain available as alternatives.
+
+model = LinearRegression()
+# model = XGBRegressor(
+#     n_estimators=100, max_depth=10, eta=0.3, subsample=0.8, random_state=42
+# )
 # model = RandomForestRegressor(random_state=42)
 
 fit_and_predict(model)
@@ -318,10 +472,11 @@ plt.show()
 #%%
 # .. image:: ../../_static/doe_ml_predictions_regression.png
 #    :align: center
-#    :alt: Regression Model Predictions
+#    :alt: XGBoost Regression Model Predictions
 
 #%%
-#    Regression Model Predictions
+#    Regression Model Predictions, obtained with the alternative XGBoost model. The
+#    default linear model gives its own parity plots when the example is run.
 
 ###########################################################
 # 3D Visualization of Model Predictions on Train & Test Set
@@ -358,106 +513,30 @@ fig.update_layout(
 
 fig.show()
 
-################################################
-# TensorFlow and Keras Neural Network Regression
-# ==============================================
-
-print("TensorFlow version is:", tf.__version__)
-keras.backend.clear_session()
-np.random.seed(42)
-tf.random.set_seed(42)
-
-model = keras.models.Sequential(
-    [
-        keras.layers.Dense(
-            20,
-            activation="relu",
-            input_shape=X_train.shape[1:],
-            kernel_initializer="lecun_normal",
-        ),
-        keras.layers.BatchNormalization(),
-        keras.layers.Dense(20, activation="relu", kernel_initializer="lecun_normal"),
-        keras.layers.BatchNormalization(),
-        keras.layers.Dense(20, activation="relu", kernel_initializer="lecun_normal"),
-        keras.layers.BatchNormalization(),
-        keras.layers.Dense(1),
-    ]
-)
-
-optimizer = tf.keras.optimizers.Adam(learning_rate=0.1, beta_1=0.9, beta_2=0.999)
-
-model.compile(loss="mean_squared_error", optimizer=optimizer)
-checkpoint_cb = keras.callbacks.ModelCheckpoint(
-    "my_keras_model.h5", save_best_only=True
-)
-early_stopping_cb = keras.callbacks.EarlyStopping(
-    patience=30, restore_best_weights=True
-)
-
-model.summary()
+#############################
+# Gaussian Process Regression
+# ===========================
+# With only a few dozen DOE points a neural network has more weights than there
+# are samples to train it. A Gaussian process gives a smooth surrogate of the smooth
+# CFD response instead. For given kernel hyperparameters it is fitted by factorizing
+# the kernel matrix of the training points, the hyperparameters themselves are found
+# by a single L-BFGS optimization of the marginal likelihood in every fit, without
+# restarts from random starting points.
+#
+# * Call fit_and_predict
 
-# keras.utils.plot_model(model, show_shapes=True,) # to_file='dot_img.png', )
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import RBF, ConstantKernel
 
-history = model.fit(
-    X_train,
-    y_train,
-    epochs=250,
-    validation_split=0.2,
-    callbacks=[checkpoint_cb, early_stopping_cb],
+kernel = ConstantKernel(1.0) * RBF(length_scale=np.ones(X_train.shape[1]))
+model = GaussianProcessRegressor(
+    kernel=kernel, normalize_y=True, n_restarts_optimizer=0, random_state=42
 )
-model = keras.models.load_model("my_keras_model.h5")
-
-print(history.params)
-
-pd.DataFrame(history.history).plot(figsize=(8, 5))
-plt.grid(True)
-plt.show()
-
-train_predictions = model.predict(X_train)
-test_predictions = model.predict(X_test)
-train_predictions = np.ravel(train_predictions.T)
-test_predictions = np.ravel(test_predictions.T)
-print(test_predictions.shape)
-
-print("\n\nTrain R2: %0.3f" % (r2_score(train_predictions, y_train)))
-print("Test R2: %0.3f" % (r2_score(test_predictions, y_test)))
-print("Predictions - Ground Truth (Kelvin): ", (test_predictions - y_test))
-
-fig = plt.figure(figsize=(12, 5))
-
-fig.add_subplot(121)
-sns.regplot(x=y_train, y=train_predictions, color="g")
-plt.title("Train Data", fontsize=16)
-plt.xlabel("Ground Truth", fontsize=12)
-plt.ylabel("Predictions", fontsize=12)
-
-fig.add_subplot(122)
-sns.regplot(x=y_test, y=test_predictions, color="g")
-plt.title("Test/Unseen Data", fontsize=16)
-plt.xlabel("Ground Truth", fontsize=12)
-plt.ylabel("Predictions", fontsize=12)
-
-plt.tight_layout()
 
+fit_and_predict(model)
 
 #############################################################################
 # Show graph
 # ==========
 
 plt.show()
-
-#%%
-# .. image:: ../../_static/doe_ml_validation_loss.png
-#    :align: center
-#    :alt: Neural Network Validation Loss
-
-#%%
-#    Neural Network Validation Loss
-
-#%%
-# .. image:: ../../_static/doe_ml_predictions_neural_network.png
-#    :align: center
-#    :alt: Neural Network Predictions
-
-#%%
-#    Neural Network Predictions
@@ -27,6 +27,7 @@ Conjugate Heat Transfer
 # =================================
 
 import csv
+from itertools import islice
 import os
 from pathlib import Path
 
@@ -38,6 +39,7 @@ from ansys.fluent.visualization.matplotlib import matplot_windows_manager  # noq
 from ansys.fluent.visualization.pyvista import Graphics, pyvista_windows_manager
 from ansys.fluent.visualization.pyvista.pyvista_windows_manager import PyVistaWindow
 import matplotlib.pyplot as plt
+import numpy as np
 import pyvista as pv
 
 ###########################################################################
@@ -68,7 +70,7 @@ meshing = pyfluent.launch_fluent(
     mode="meshing",
     version="3d",
     precision="double",
-    show_gui=True,
+    show_gui=False,
     processor_count=4,
 )
 
@@ -703,32 +705,54 @@ save_case_data_as = str(Path(pyfluent.EXAMPLES_PATH) / "hx-fin-2mm.dat.h5")
 solver.tui.file.write_case_data(save_case_data_as)
 
 #############################################################################
-# Post-Processing Mass Balance Report
-# ===================================
+# Post-Processing Mass and Heat Balance Reports
+# =============================================
+# The mass flow rates and the net heat transfer rate over all boundary zones are
+# defined as flux reports and computed together
+
+mass_flow_reports = {
+    "inlet-mfr": ["inlet"],
+    "outlet-mfr": ["outlet"],
+    "net-mfr": ["inlet", "outlet"],
+}
+for name, zone_names in mass_flow_reports.items():
+    solver.solution.report_definitions.flux[name] = {
+        "report_type": "flux-massflow",
+        "zone_names": zone_names,
+    }
+
+solver.solution.report_definitions.flux["net-htr"] = {
+    "report_type": "flux-heattransfer"
+}
+# Interior face zones are left out, like the heat-transfer flux report of the TUI
+interior_zones = set(solver.setup.boundary_conditions.interior.get_object_names())
+heat_report = solver.solution.report_definitions.flux["net-htr"]
+heat_report.zone_names = [
+    zone
+    for zone in heat_report.zone_names.allowed_values()
+    if zone not in interior_zones
+]
+
+reports = solver.solution.report_definitions.compute(
+    report_defs=list(mass_flow_reports) + ["net-htr"]
+)
+fluxes = {name: value[0] for r in reports for name, value in r.items()}
+
+#############################################################################
+# Mass Balance Report
+# ===================
 
-inlet_mfr = solver.scheme_eval.exec(
-    ('(ti-menu-load-string "/report/fluxes/mass-flow no inlet () no")',)
-).split(" ")[-1]
-outlet_mfr = solver.scheme_eval.exec(
-    ('(ti-menu-load-string "/report/fluxes/mass-flow no outlet () no")',)
-).split(" ")[-1]
-net_mfr = solver.scheme_eval.exec(
-    ('(ti-menu-load-string "/report/fluxes/mass-flow no inlet outlet () no")',)
-).split(" ")[-1]
 print("Mass Balance Report\n")
-print("Inlet (kg/s): ", inlet_mfr)
-print("Outlet (kg/s): ", outlet_mfr)
-print("Net (kg/s): ", net_mfr)
+print("Inlet (kg/s): ", fluxes["inlet-mfr"])
+print("Outlet (kg/s): ", fluxes["outlet-mfr"])
+print("Net (kg/s): ", fluxes["net-mfr"])
 
 #############################################################################
 # Heat Balance Report
 # ===================
 
-htr = solver.scheme_eval.exec(
-    ('(ti-menu-load-string "/report/fluxes/heat-transfer yes no")',)
-).split(" ")[-1]
 print("Heat Balance Report\n")
-print("Net Imbalance (Watt): ", htr)
+print("Net Imbalance (Watt): ", fluxes["net-htr"])
 
 #############################################################################
 # Plot Monitors
@@ -747,18 +771,11 @@ outFilesList.sort()
 
 index = 0
 for ax in axs.flat:
-    X = []
-    Y = []
-    i = -1
     with open(outFilesList[index], "r") as datafile:
-        plotting = csv.reader(datafile, delimiter=" ")
-        for rows in plotting:
-            i += 1
-            if i == 1:
-                var = rows[1]
-            if i > 2:
-                X.append(int(rows[0]))
-                Y.append(float(rows[1]))
+        # The first three lines are the header; the second one holds the report name
+        header = list(csv.reader(islice(datafile, 3), delimiter=" "))
+        var = header[1][1]
+        X, Y = np.loadtxt(datafile, usecols=(0, 1), unpack=True)
 
     ax.plot(X, Y)
     ax.set(xlabel="Iteration", ylabel=var, title=var)
@@ -84,7 +84,6 @@ Tyler-Sofrin Compressor Modes Post-Processing
 #######################################################################################
 # Import required libraries/modules
 # =====================================================================================
-import math
 from pathlib import Path
 import random
 
@@ -122,7 +121,7 @@ examples.download_file(
 # Launch Fluent session
 # =====================================================================================
 session = pyfluent.launch_fluent(
-    show_gui=True, processor_count=4, product_version="23.2.0"
+    show_gui=False, processor_count=4, product_version="23.2.0"
 )
 
 #######################################################################################
@@ -163,52 +162,56 @@ m_inc = 2  # TS mode increment
 #######################################################################################
 # Create monitor points
 # =====================================================================================
-for angle in range(0, 360, d_theta):
-    x = math.cos(math.radians(angle)) * r
-    y = math.sin(math.radians(angle)) * r
+angles = list(range(0, 360, d_theta))
+x_points = (r * np.cos(np.radians(angles))).tolist()
+y_points = (r * np.sin(np.radians(angles))).tolist()
+
+for angle, x, y in zip(angles, x_points, y_points):
     session.tui.surface.point_surface("point-" + str(angle), x, y, z)
 
 #######################################################################################
 # Compute Fourier coefficients at each monitor point (An, Bn)
 # =====================================================================================
-An = np.zeros((len(varname), int(360 / d_theta)))
-Bn = np.zeros((len(varname), int(360 / d_theta)))
-
-for angle_ind, angle in enumerate(range(0, 360, d_theta)):
-    for n_ind, variable in enumerate(varname):
-        if len(variable) >= 4 and variable[:4] == "mean":
-            session.solution.report_definitions.surface["mag-report"] = {
-                "report_type": "surface-vertexavg",
-                "surface_names": ["point-" + str(angle)],
-                "field": str(variable),
-            }
-            mag = session.solution.report_definitions.compute(
-                report_defs=["mag-report"]
-            )
-            mag = mag[0]["mag-report"][0]
-            An[n_ind][angle_ind] = mag
-            Bn[n_ind][angle_ind] = 0
-        else:
-            session.solution.report_definitions.surface["mag-report"] = {
-                "report_type": "surface-vertexavg",
-                "surface_names": ["point-" + str(angle)],
-                "field": str(variable) + "-mag",
-            }
-            mag = session.solution.report_definitions.compute(
-                report_defs=["mag-report"]
-            )
-            mag = mag[0]["mag-report"][0]
-            session.solution.report_definitions.surface["phase-report"] = {
-                "report_type": "surface-vertexavg",
-                "surface_names": ["point-" + str(angle)],
-                "field": str(variable) + "-phase",
-            }
-            phase = session.solution.report_definitions.compute(
-                report_defs=["phase-report"]
-            )
-            phase = phase[0]["phase-report"][0]
-            An[n_ind][angle_ind] = mag * math.cos(phase)
-            Bn[n_ind][angle_ind] = -mag * math.sin(phase)
+#
+# One report definition is kept per monitor point and re-pointed to each variable,
+# so that the values at all monitor points are computed in a single request.
+
+
+def define_point_reports(prefix: str, field: str) -> list[str]:
+    # Define (or update) a vertex-average report of field at every monitor point
+    names = []
+    for angle in angles:
+        name = prefix + "-" + str(angle)
+        session.solution.report_definitions.surface[name] = {
+            "report_type": "surface-vertexavg",
+            "surface_names": ["point-" + str(angle)],
+            "field": field,
+        }
+        names.append(name)
+    return names
+
+
+def compute_reports(names: list[str]) -> np.ndarray:
+    # Compute all the report definitions at once and return them in order
+    reports = session.solution.report_definitions.compute(report_defs=names)
+    values = {name: value[0] for r in reports for name, value in r.items()}
+    return np.array([values[name] for name in names])
+
+
+An = np.zeros((len(varname), len(angles)))
+Bn = np.zeros((len(varname), len(angles)))
+
+for n_ind, variable in enumerate(varname):
+    if len(variable) >= 4 and variable[:4] == "mean":
+        An[n_ind] = compute_reports(define_point_reports("mag-report", variable))
+    else:
+        mag_reports = define_point_reports("mag-report", variable + "-mag")
+        phase_reports = define_point_reports("phase-report", variable + "-phase")
+        values = compute_reports(mag_reports + phase_reports)
+        mag = values[: len(angles)]
+        phase = values[len(angles) :]
+        An[n_ind] = mag * np.cos(phase)
+        Bn[n_ind] = -mag * np.sin(phase)
 
 
 #######################################################################################
@@ -220,21 +223,23 @@ for angle_ind, angle in enumerate(range(0, 360, d_theta)):
 #   tools. Update the path to the file accordingly.
 
 fourier_coefficients_file = Path(save_path, "FourierCoefficients.txt")
-with open(fourier_coefficients_file, "w") as f:
-    f.write("n theta An Bn \n")
-
-    for n_ind, variable in enumerate(varname):
-        for ind, x in enumerate(An[n_ind, :]):
-            f.write(
-                str(n_mode[n_ind])
-                + ","
-                + str(ind * d_theta)
-                + ","
-                + str(An[n_ind, ind])
-                + ","
-                + str(Bn[n_ind, ind])
-                + "\n"
-            )
+n_angles = An.shape[1]
+rows = np.column_stack(
+    [
+        np.repeat(n_mode, n_angles),
+        np.tile(np.arange(0, 360, d_theta), len(n_mode)),
+        An.ravel(),
+        Bn.ravel(),
+    ]
+)
+np.savetxt(
+    fourier_coefficients_file,
+    rows,
+    fmt=["%d", "%d", "%.17g", "%.17g"],
+    delimiter=",",
+    header="n theta An Bn",
+    comments="",
+)
 
 
 #######################################################################################
@@ -248,25 +253,15 @@ with open(fourier_coefficients_file, "w") as f:
 
 m_mode = range(-m_max, m_max + m_inc, m_inc)
 
-# Initialize solution matrices with zeros
-Anm = np.zeros((len(varname), len(m_mode)))
-Bnm = np.zeros((len(varname), len(m_mode)))
-Pnm = np.zeros((len(varname), len(m_mode)))
-
-for n_ind, variable in enumerate(varname):  # loop over n modes
-    for m_ind, m in enumerate(m_mode):  # loop over m modes
-        for angle_ind, angle in enumerate(
-            np.arange(0, math.radians(360), math.radians(d_theta))
-        ):  # loop over all angles, in radians
-            Anm[n_ind][m_ind] += An[n_ind][angle_ind] * math.cos(m * angle) - Bn[n_ind][
-                angle_ind
-            ] * math.sin(m * angle)
-            Bnm[n_ind][m_ind] += An[n_ind][angle_ind] * math.sin(m * angle) + Bn[n_ind][
-                angle_ind
-            ] * math.cos(m * angle)
-        Anm[n_ind][m_ind] = Anm[n_ind][m_ind] / (2 * math.pi) * math.radians(d_theta)
-        Bnm[n_ind][m_ind] = Bnm[n_ind][m_ind] / (2 * math.pi) * math.radians(d_theta)
-        Pnm[n_ind][m_ind] = math.sqrt(Anm[n_ind][m_ind] ** 2 + Bnm[n_ind][m_ind] ** 2)
+# The monitor points sample the full circle uniformly, so Anm + i*Bnm is the
+# discrete Fourier transform of An + i*Bn over the angles. numpy's inverse FFT uses
+# the same exp(+i*m*theta) kernel and its 1/N normalization equals d_theta/(2*pi).
+# Mode m is found in FFT bin m modulo the number of monitor points.
+coefficients = np.fft.ifft(An + 1j * Bn, axis=1)[:, np.mod(m_mode, n_angles)]
+
+Anm = coefficients.real
+Bnm = coefficients.imag
+Pnm = np.abs(coefficients)
 
 # P_00 is generally orders of magnitude larger than that of other modes.
 # Giving focus to other modes by setting P_00 equal to zero